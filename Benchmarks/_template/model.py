@@ -14,4 +14,7 @@ def model(Rrs, wavelengths, *args, **kwargs):
 	# Set default values for these parameters
 	a = kwargs.get('a', )
 	b = kwargs.get('b', )
-	return
\ No newline at end of file
+	return
+
+# Optionally declare which sensors are supported, to skip the test evaluation done by get_methods
+# model.supported_sensors = []
\ No newline at end of file
@@ -84,3 +84,6 @@ def model(Rrs, wavelengths, sensor, *args, **kwargs):
 	estimate[type1] = (a * bbp_665 ** b).flatten()[type1]
 
 	return estimate
+
+# Sensors with a trained MDN model available, allowing the benchmark check to skip a test evaluation
+model.supported_sensors = list(params) + ['S2B']
\ No newline at end of file
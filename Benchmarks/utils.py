@@ -62,20 +62,26 @@ class Optimizer:
 			warnings.filterwarnings('ignore')
 			return self.function(*args, **kwargs)
 
-	def fit(self, X, Y, wavelengths):
+	def fit(self, X, Y, wavelengths, verbose=True, **kwargs):
+		''' Any additional kwargs (e.g. sensor) are passed to the function. 
+			Returns the (name, optimal parameters, cost) summary of the fit, 
+			which is only printed if verbose. '''
 		def cost_func(guess):
 			assert(np.all(np.isfinite(guess))), guess
 			guess = dict(zip(self.opt_vars, guess))
-			return np.nanmedian(np.abs((self(X, wavelengths, **guess) - Y) / Y))
-			return np.abs(np.nanmean(self(X, wavelengths, **guess) - Y))
-			return ((self(X, wavelengths, **guess) - Y) ** 2).sum() ** 0.5
+			return np.nanmedian(np.abs((self(X, wavelengths, **kwargs, **guess) - Y) / Y))
+			return np.abs(np.nanmean(self(X, wavelengths, **kwargs, **guess) - Y))
+			return ((self(X, wavelengths, **kwargs, **guess) - Y) ** 2).sum() ** 0.5
 		from skopt import gbrt_minimize
 		init = [(1e-2,100)]*len(self.opt_vars)
 		# res  = minimize(cost_func, init, tol=1e-6, options={'maxiter':1e3}, method='BFGS')
 		res  = gbrt_minimize(cost_func, init, n_random_starts=10000, n_calls=10000)#, method='SLSQP')#, tol=1e-10, options={'maxiter':1e5}, method='SLSQP')
-		print(self.__name__, res.x, res.fun)
+		name = getattr(self, 'model_name', None) or getattr(self.function, '__name__', type(self).__name__)
+		if verbose:
+			print(name, res.x, res.fun)
 
-		self.trained_function = partial(self.function, wavelengths=wavelengths, **dict(zip(self.opt_vars, res.x)))
+		self.trained_function = partial(self.function, wavelengths=wavelengths, **kwargs, **dict(zip(self.opt_vars, res.x)))
+		return name, res.x, res.fun
 
 	def predict(self, X):
 		return self.trained_function(X)
@@ -1,14 +1,24 @@
-from .metrics      import performance
+from .metrics      import performance, performance_batch
 from .utils        import find_wavelength
 from .meta         import get_sensor_bands
-from .transformers import TransformerPipeline, LogTransformer
 
 from importlib import import_module
-from functools import partial
+from functools import partial, lru_cache
+from argparse  import Namespace
 from pathlib   import Path 
 
 import numpy as np
-import pkgutil, warnings, sys, os
+import pkgutil, warnings
+
+
+# Memoized get_methods results, keyed on (sensor, product, wavelengths, allow_opt, kwargs)
+_method_cache = {}
+
+# Benchmark model functions available for each product, as {product: {model_name: function}}
+_BENCHMARK_REGISTRY = {}
+
+# (product, model_name) pairs which have already printed a validation failure
+_reported_failures = set()
 
 
 def get_methods(wavelengths, sensor, product, debug=True, allow_opt=False, **kwargs):
@@ -18,114 +28,227 @@ def get_methods(wavelengths, sensor, product, debug=True, allow_opt=False, **kwa
 		available, and test whether the function can be run with the
 		given wavelengths. A template folder for new algorithms is 
 		available in the Benchmarks directory.
+
+		Results are memoized on the (hashable) arguments, so that 
+		repeated calls with the same sensor / product / wavelengths
+		skip the discovery and validation steps. The debug flag is 
+		not part of the key, as it only controls printing.
 	'''
+	sensor = sensor.split('-')[0] # remove any extra data which is used by the MDN
+	key    = (sensor, product, tuple(np.ravel(wavelengths).tolist()), allow_opt, frozenset(kwargs.items()))
+	if key not in _method_cache:
+		_method_cache[key] = _find_methods(np.array(key[2]), sensor, product, debug, allow_opt, dict(kwargs))
+	return dict(_method_cache[key])
+
+
+def _find_methods(wavelengths, sensor, product, debug, allow_opt, kwargs):
+	''' Uncached implementation of get_methods '''
+	if product not in _BENCHMARK_REGISTRY:
+		_BENCHMARK_REGISTRY[product] = _discover(product, debug)
+
 	methods = {}
-	sensor  = sensor.split('-')[0] # remove any extra data which is used by the MDN
+	for model_name, model in _BENCHMARK_REGISTRY[product].items():
+		if model.has_default or allow_opt:
+
+			# Models may declare which sensors they support, avoiding the need for a test evaluation
+			if sensor in getattr(model, 'supported_sensors', []):
+				valid = True
+			else:
+				valid = _probe_model(model, model_name, wavelengths, sensor, product, debug, kwargs)
+
+			if valid:
+				methods[model_name] = _bind(model, sensor)
+				methods[model_name].__name__ = model_name 
+
+		# Models which don't have default parameters available can only be run through bench_opt	
+		elif debug:
+			print(model_name,'requires optimization')
+	return methods
+
+
+def _bind(model, sensor):
+	''' Bind the sensor to a model, avoiding the kwargs merge which partial performs on each call.
+		The Optimizer fit / predict methods are exposed with the sensor bound as well. '''
+	def bound_model(x, waves, tol=15):
+		return model(x, waves, sensor=sensor, tol=tol)
+
+	bound_model.fit     = lambda X, Y, wavelengths, **kwargs: model.fit(X, Y, wavelengths, sensor=sensor, **kwargs)
+	bound_model.predict = lambda X: model.predict(X)
+	return bound_model
+
+
+def _probe_model(model, model_name, wavelengths, sensor, product, debug, kwargs):
+	''' Test whether the model can be run with the given wavelengths, by 
+		evaluating it on dummy data. Failures are only reported once. '''
+
+	# Add a set of dummy parameters to check if wavelengths are valid for the method
+	if not model.has_default:
+		kwargs.update( dict(zip(model.opt_vars, [1]*len(model.opt_vars))) )
+
+	try: 
+		return model(np.ones((1, len(wavelengths))), wavelengths, sensor, **kwargs) is not None
+	except Exception as e: 
+		if debug and (product, model_name) not in _reported_failures:
+			_reported_failures.add( (product, model_name) )
+			print(f'Exception for function {model_name}: {e}')
+	return False
+
+
+def _discover(product, debug=True):
+	''' Import every algorithm folder in the given product directory a
+		single time, and return a {model_name: function} dict containing 
+		each function with "model" in its name. An algorithm which fails 
+		to import is skipped, rather than preventing the others from 
+		being available. 
+	'''
+	registry = {}
+	module   = Path(__file__).parent.stem
 
 	# Iterate over all benchmark algorithm folders in the appropriate product directory
 	for (_, name, is_folder) in pkgutil.iter_modules([Path(__file__).parent.resolve().joinpath('Benchmarks', product)]):
 		if is_folder:
-			module   = Path(__file__).parent.stem
-			imported = import_module(f'{module}.Benchmarks.{product}.{name}.model')
+			try:
+				imported = import_module(f'{module}.Benchmarks.{product}.{name}.model')
+			except Exception as e:
+				if debug:
+					print(f'Failed to import benchmark {name}: {e}')
+				continue
+
 			for function in dir(imported):
 
 				# Check all functions which have "model" in their name
 				if 'model' in function: 
 					model = getattr(imported, function)
 					if hasattr(model, 'has_default'):
-						if model.has_default or allow_opt:
-
-							# Add a set of dummy parameters to check if wavelengths are valid for the method
-							if not model.has_default:
-								kwargs.update( dict(zip(model.opt_vars, [1]*len(model.opt_vars))) )
-
-							try: 
-								out = model(np.ones((1, len(wavelengths))), wavelengths, sensor, **kwargs)
-								if out is not None:
-									model_name          = getattr(model, 'model_name', name)
-									methods[model_name] = partial(model, sensor=sensor)
-									methods[model_name].__name__ = model_name 
-							except Exception as e: 
-								if debug:
-									print(f'Exception for function {name}: {e}')
-
-						# Models which don't have default parameters available can only be run through bench_opt	
-						elif debug:
-							print(name,'requires optimization')
-	return methods
+						registry[getattr(model, 'model_name', name)] = model
+	return registry
+
+
+def get_waves(sensor, args=None):
+	''' Memoized get_sensor_bands, returned as a contiguous float32 array to
+		match the precision of the Rrs data. The array is shared between
+		calls, and so is read-only. '''
+	return _cached_bands(sensor, _bands_key(args))
+
+
+def _bands_key(args):
+	''' Hashable cache key, using only the args attributes which get_sensor_bands reads '''
+	return None if args is None else (args.sat_bands, getattr(args, 'product', None))
 
 
-def bench_product(args, sensor, x_test, y_test=None, slices=None, silent=True, product='chl', method=None):
+@lru_cache(maxsize=None)
+def _cached_bands(sensor, key):
+	args  = None if key is None else Namespace(sat_bands=key[0], product=key[1])
+	waves = np.ascontiguousarray(get_sensor_bands(sensor, args), dtype=np.float32)
+	waves.setflags(write=False)
+	return waves
+
+
+@lru_cache(maxsize=None)
+def _cached_index(wavelength, sensor, key=None, n_bands=None):
+	''' Memoized find_wavelength over the first n_bands cached bands of a sensor '''
+	return find_wavelength(wavelength, _cached_bands(sensor, key)[:n_bands])
+
+
+def bench_product(args, sensor, x_test, y_test=None, slices=None, silent=True, product='chl', method=None, n_jobs=1):
+	''' Run all available benchmark algorithms for the given product. The
+		algorithms are independent, so n_jobs > 1 (or -1 for all cores) 
+		evaluates them in parallel worker processes. '''
+	from joblib import Parallel, delayed
 	assert(silent or y_test is not None), 'Must provide y values or set silent=True'
 
-	waves = get_sensor_bands(sensor, args)
+	waves = get_waves(sensor, args)
 	assert(x_test.shape[1] <= len(waves)), f'Too many features given as bands for {sensor}: {x_test.shape[1]} vs {len(waves)}'
 
 	methods = get_methods(waves, sensor, product, tol=15)
 	assert(method is None or method in methods), f'Unknown algorithm "{method}". Options are: \n{list(methods.keys())}'
 
-	ests = []
-	lbls = []
-	for name, func in methods.items():
-		if method is None or name == method:
-			est_val = func(x_test, waves, tol=15)
-			
-			if product == 'chl':
-				est_val[~np.isfinite(est_val)] = 0
-				est_val[est_val < 0] = 0
-
-			if not silent:
-				curr_slice = slices
-				if slices is None:
-					assert(y_test.shape[1] == est_val.shape[1]), 'Ambiguous y data provided - need to give slices parameter.'
-					curr_slice = {product:slice(None)}
-
-				ins_val = y_test[:, curr_slice[product]]
-				for i in range(ins_val.shape[1]):
-					print( performance(name, ins_val[:, i], est_val) )
-			ests.append(est_val)
-			lbls.append(name)
+	lbls = [name for name in methods if method is None or name == method]
+	ests = Parallel(n_jobs=n_jobs, prefer='processes')(
+		delayed(_run_product)(methods[name], x_test, waves, product) for name in lbls)
+
+	# Skip any algorithms which failed, rather than aborting the entire benchmark
+	for name, est_val in zip(lbls, ests):
+		if isinstance(est_val, Exception):
+			print(f'Exception for function {name}: {est_val}')
+	lbls = [name for name, est_val in zip(lbls, ests) if not isinstance(est_val, Exception)]
+	ests = [est_val for est_val in ests if not isinstance(est_val, Exception)]
+
+	if not silent:
+		ins_val = y_test[:, (slices or {product:slice(None)})[product]]
+		for name, est_val in zip(lbls, ests):
+			assert(slices is not None or ins_val.shape[1] == est_val.shape[1]), 'Ambiguous y data provided - need to give slices parameter.'
+			print( '\n'.join(performance_batch(name, ins_val, est_val)) )
 	return dict(zip(lbls, ests))
+
+
+def _run_product(func, x_test, waves, product):
+	''' Evaluate a single benchmark algorithm for bench_product, returning 
+		the exception instead if the algorithm fails '''
+	try:
+		est_val = func(x_test, waves, tol=15)
+	except Exception as e:
+		return e
+	
+	# Set non-finite and negative estimates to zero, in place
+	if product == 'chl':
+		np.nan_to_num(est_val, copy=False, nan=0., posinf=0., neginf=0.)
+		np.maximum(est_val, 0., out=est_val)
+	return est_val
 	
 
-def bench_opt(args, sensor, x_train, x_test, y_train, y_test, slices, silent=False, product='chl'):
-	waves   = np.array(get_sensor_bands(sensor))
+def bench_opt(args, sensor, x_train, x_test, y_train, y_test, slices, silent=False, product='chl', n_jobs=1):
+	from joblib import Parallel, delayed
+	waves   = get_waves(sensor)
 	methods = get_methods(waves, sensor, product, allow_opt=True)
 
+	fits = Parallel(n_jobs=n_jobs, prefer='processes')(
+		delayed(_run_opt)(method, x_train, x_test, y_train[:, slices[product]], waves) for method in methods.values())
 	ests = []
 	lbls = []
-	for name, method in methods.items():
-		method.fit(x_train, y_train, waves)
-		est_chl = method.predict(x_test)
+	for name, (est_chl, summary) in zip(methods, fits):
+		print(*summary)
+		ests.append(est_chl)
 
 		if not silent:
 			ins_val = y_test[:, slices[product]]
-			for i in range(ins_val.shape[1]):
-				print( performance(name.split('_')[0], ins_val[:, i], est_chl) )
-		ests.append(est_chl)
+			print( '\n'.join(performance_batch(name.split('_')[0], ins_val, est_chl)) )
 		lbls.append(name+'_opt')
 	return dict(zip(lbls, ests))
 
 
+def _run_opt(method, x_train, x_test, y_train, waves):
+	''' Optimize and evaluate a single benchmark algorithm for bench_opt, 
+		returning the estimates along with the fit summary - which is printed 
+		by bench_opt, so that the output of parallel workers isn't interleaved '''
+	summary = method.fit(x_train, y_train, waves, verbose=False)
+	return method.predict(x_test), summary
+
+
 def bench_ml(args, sensor, x_train, y_train, x_test, y_test, slices=None, silent=False, product='chl', x_other=None, 
-			bagging=True, gridsearch=False, scale=True):
-	from sklearn.preprocessing import RobustScaler, QuantileTransformer, MinMaxScaler
-	from sklearn.model_selection import GridSearchCV
-	from sklearn.ensemble import BaggingRegressor
-	from sklearn import gaussian_process, svm, neural_network, kernel_ridge, neighbors
+			bagging=True, gridsearch=False, scale=True, n_jobs=1):
+	''' Benchmark a set of machine learning estimators. With n_jobs != 1, the
+		estimators themselves are fit concurrently: using threads for those 
+		which release the GIL, and worker processes for the remainder. Any 
+		cores left over are given to the search / bagging within each, which 
+		also runs in threads for the threaded estimators. '''
+	from .transformers import TransformerPipeline, LogTransformer
+	from sklearn.preprocessing import RobustScaler
+	from sklearn import svm, neural_network, neighbors # gaussian_process, kernel_ridge
 	from xgboost import XGBRegressor as XGB
-	from sklearn.exceptions import ConvergenceWarning
-	warnings.simplefilter("always", ConvergenceWarning)
+	from joblib import Parallel, delayed, cpu_count
+	from joblib.externals.loky import get_reusable_executor
 
 	# gridsearch=False
 	methods = {
 		'XGB' : {
 			'class'   : XGB,
-			'default' : {'max_depth': 15, 'n_estimators': 50, 'objective': 'reg:squarederror'},
+			'default' : {'max_depth': 15, 'n_estimators': 50, 'objective': 'reg:squarederror', 'tree_method': 'hist', 'n_jobs': 1},
 			'grid'    : {
 				'n_estimators' : [10, 50, 100],
 				'max_depth'    : [5, 15, 30],
 				'objective'    : ['reg:squarederror'],
+				'tree_method'  : ['hist'],
 			}},
 		'SVM' : {
 			'class'   : svm.SVR,
@@ -145,7 +268,7 @@ def bench_ml(args, sensor, x_train, y_train, x_test, y_test, slices=None, silent
 			}},
 		'KNN' : {
 			'class'   : neighbors.KNeighborsRegressor,
-			'default' : {'n_neighbors': 5, 'p':1},
+			'default' : {'n_neighbors': 5, 'p':1, 'n_jobs': 1},
 			'grid'    : {
 				'n_neighbors' : [3, 5, 10, 20],
 				'p'           : [1, 2, 3],
@@ -166,80 +289,156 @@ def bench_ml(args, sensor, x_train, y_train, x_test, y_test, slices=None, silent
 		# 	}},
 	}
 
-	# Filter MLP convergence warnings
-	if not sys.warnoptions:
-		warnings.simplefilter('ignore')
-		os.environ['PYTHONWARNINGS'] = 'ignore'
-
-	if False:
-		x_train = x_train[:,:len(get_sensor_bands(sensor, args))]
-		x_test  = x_test[:,:len(get_sensor_bands(sensor, args))]
-
-	if scale:
-		x_scaler = RobustScaler()
-		y_scaler = TransformerPipeline([LogTransformer()])#, MinMaxScaler((-1, 1))]) 
-		x_scaler.fit(x_train)
-		y_scaler.fit(y_train)
-		x_train = x_scaler.transform(x_train)
-		x_test  = x_scaler.transform(x_test)
-		y_train = y_scaler.transform(y_train)
-
-	if slices is None:
-		assert(y_test.shape[1] == y_train.shape[1]), 'Ambiguous y data provided - need to give slices parameter.'
-		slices = {product:slice(None)}
-
+	# Filter MLP convergence warnings (and others), without modifying the global warning state
 	with warnings.catch_warnings():
 		warnings.filterwarnings('ignore')
+
+		# Successive halving prunes poor candidates on small subsets before fitting the full data
+		search_cv = None
+		if gridsearch:
+			try:
+				from sklearn.experimental import enable_halving_search_cv # noqa: F401
+				from sklearn.model_selection import HalvingGridSearchCV
+				search_cv = partial(HalvingGridSearchCV, factor=3, resource='n_samples', min_resources='exhaust')
+
+			# HalvingGridSearchCV requires scikit-learn >= 0.24; otherwise sample a subset of the grid
+			except ImportError:
+				from sklearn.model_selection import RandomizedSearchCV
+				search_cv = partial(RandomizedSearchCV, n_iter=10)
+
+		if False:
+			x_train = x_train[:,:len(get_sensor_bands(sensor, args))]
+			x_test  = x_test[:,:len(get_sensor_bands(sensor, args))]
+
+		y_scaler = None
+		if scale:
+			x_scaler = RobustScaler()
+			y_steps  = [LogTransformer()]#, MinMaxScaler((-1, 1))]
+
+			# Avoid the pipeline dispatch when only a single transformer is used
+			y_scaler = y_steps[0] if len(y_steps) == 1 else TransformerPipeline(y_steps)
+			x_train  = x_scaler.fit_transform(x_train)
+			x_test   = x_scaler.transform(x_test)
+			y_train  = y_scaler.fit_transform(y_train)
+
+		if slices is None:
+			assert(y_test.shape[1] == y_train.shape[1]), 'Ambiguous y data provided - need to give slices parameter.'
+			slices = {product:slice(None)}
+
+		# Estimators do not modify their inputs, so the same arrays are shared across all methods
+		fit_kws = {
+			'x_train'   : x_train,
+			'y_train'   : y_train.ravel(),
+			'x_test'    : x_test,
+			'x_other'   : x_other,
+			'y_scaler'  : y_scaler,
+			'search_cv' : search_cv,
+			'bagging'   : bagging,
+			'gridsearch': gridsearch,
+		}
+
+		# Share the core budget between the estimators fit concurrently, and the search / bagging jobs within each
+		cores = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+		outer = max(1, min(len(methods), cores))
+		inner = -1 if outer == 1 else max(1, cores // outer)
+
 		if gridsearch:
 			print('\nPerforming gridsearch...')
 
-		other = []
-		ests  = []
-		lbls  = []
-		for method, params in methods.items():
-			if gridsearch:
-				model = GridSearchCV(params['class'](), params['grid'], refit=False, n_jobs=3, scoring='neg_median_absolute_error')
-				model.fit(x_train.copy(), y_train.copy().flatten())
+		if outer == 1:
+			results = {method: _fit_ml(methods[method], n_jobs=inner, **fit_kws) for method in methods}
 
-				print(f'Best {method} params: {model.best_params_}')
-				model = params['class'](**model.best_params_)
+		else:
+			threaded = [m for m in methods if m in _THREADED_ML]
+			process  = [m for m in methods if m not in _THREADED_ML]
 
-			else:
-				model = params['class'](**params['default'])
+			# Split the concurrent estimator slots between the two groups, in proportion to their size
+			n_thread  = max(int(len(threaded) > 0), outer * len(threaded) // len(methods))
+			n_process = outer - n_thread
 
-			if bagging:
-				model = BaggingRegressor(model, n_estimators=10, max_samples=0.75, bootstrap=False)
-			model.fit(x_train.copy(), y_train.copy().flatten())
-			est_val = model.predict(x_test.copy())
+			# The process group is submitted first, so that it runs while the threaded group is fit
+			futures = {}
+			if process:
+				executor = get_reusable_executor(max_workers=n_process)
+				futures  = {method: executor.submit(_fit_ml, methods[method], n_jobs=inner, **fit_kws) for method in process}
 
-			if scale:
-				est_val = y_scaler.inverse_transform(est_val[:,None]).flatten()	
+			results = {}
+			if threaded:
+				results.update(zip(threaded, Parallel(n_jobs=n_thread, backend='threading')(
+					delayed(_fit_ml)(methods[method], n_jobs=inner, backend='threading', **fit_kws) for method in threaded)))
+			results.update({method: future.result() for method, future in futures.items()})
+
+		other = []
+		ests  = []
+		lbls  = []
+		for method in methods:
+			est_val, est_other, best_params = results[method]
+			if gridsearch:
+				print(f'Best {method} params: {best_params}')
 
 			if not silent:
 				ins_val = y_test[:, slices[product]]
-				for i in range(ins_val.shape[1]):
-					print( performance(method, ins_val[:, i], est_val) )
+				print( '\n'.join(performance_batch(method, ins_val, est_val)) )
 
 			ests.append(est_val)
 			lbls.append(method)
 
 			if x_other is not None:
-				est = model.predict(x_other.copy())
-				if scale: est = y_scaler.inverse_transform(est[:,None]).flatten()
-				other.append(est)
+				other.append(est_other)
 
 	if not len(other):
 		return dict(zip(lbls, ests))
 	return dict(zip(lbls, ests)), dict(zip(lbls, other))
 
 
+# bench_ml estimators whose fit / predict release the GIL, and so can be run in threads
+_THREADED_ML = ['XGB', 'KNN']
+
+
+def _fit_ml(params, x_train, y_train, x_test, x_other, y_scaler, search_cv, bagging, gridsearch, n_jobs, backend='loky'):
+	''' Fit a single bench_ml estimator, returning its (inverse scaled) 
+		estimates for x_test and x_other, and the best gridsearch parameters.
+		The search / bagging jobs are run using the given joblib backend. '''
+	from sklearn.ensemble import BaggingRegressor
+	from joblib import parallel_backend
+
+	with warnings.catch_warnings(), parallel_backend(backend):
+		warnings.filterwarnings('ignore')
+
+		# Estimators are single threaded, with parallelism coming from the search / bagging
+		threads = {k: v for k, v in params['default'].items() if k == 'n_jobs'}
+		best    = None
+
+		if gridsearch:
+			model = search_cv(params['class'](**threads), params['grid'], refit=False, n_jobs=n_jobs, scoring='neg_median_absolute_error')
+			model.fit(x_train, y_train)
+
+			best  = model.best_params_
+			model = params['class'](**threads, **best)
+
+		else:
+			model = params['class'](**params['default'])
+
+		if bagging:
+			model = BaggingRegressor(model, n_estimators=10, max_samples=0.75, bootstrap=False, n_jobs=n_jobs)
+		model.fit(x_train, y_train)
+
+		ests = []
+		for x in [x_test, x_other]:
+			est = None if x is None else model.predict(x)
+			if est is not None and y_scaler is not None:
+				est = y_scaler.inverse_transform(est.reshape(-1, 1)).ravel()
+			ests.append(est)
+	return ests[0], ests[1], best
+
+
 def bench_qaa(args, sensor, x_test, y_test, slices, silent=False):
 	from .QAA import QAA
-	waves = np.array(get_sensor_bands(sensor, args))
+	waves = get_waves(sensor, args)
+	x_test= x_test.astype(np.float32, copy=False)
 	param = [k for k in slices if k[0]=='a' or k[0]=='b']
 	qaa   = QAA(x_test, waves[:x_test.shape[1]])
-	ests  = []
-	lbls  = []
+	ests  = {}
 
 	for name in param:
 		if name.replace('_','') in qaa:
@@ -247,24 +446,24 @@ def bench_qaa(args, sensor, x_test, y_test, slices, silent=False):
 			est_val = qaa[name.replace('_','')]
 			assert(ins_val.shape == est_val.shape), [ins_val.shape, est_val.shape]
 
-			for i in range(ins_val.shape[1]):
-				if not silent:
-					print( performance('QAA %s%i' % (name, waves[i]), ins_val[:, i], est_val[:, i]) )
-				ests.append(est_val[:,i])
-				lbls.append('QAA %s%s' % (name, waves[i]))
+			ests[f'QAA {name}'] = est_val
+
+			if not silent:
+				lbls = _bandwise_labels(f'QAA {name}', waves, est_val.shape[1])
+				print( '\n'.join(performance_batch(lbls, ins_val, est_val)) )
 		else:
 			print(list(qaa.keys()))
 			assert(0), f"{name.replace('_','')} not found in QAA outputs"
-	return dict(zip(lbls, ests))
+	return ests
 
 
 def bench_giop(args, sensor, x_test, y_test, slices, silent=False):
 	from .GIOP.giop import GIOP
-	waves = np.array(get_sensor_bands(sensor, args))
+	waves = get_waves(sensor, args)
+	x_test= x_test.astype(np.float32, copy=False)
 	param = [k for k in slices if k[0]=='a' or k[0]=='b' or k[0]=='c']
 	gest  = GIOP(x_test, waves[:x_test.shape[1]], sensor)
-	ests  = []
-	lbls  = []
+	ests  = {}
 
 	for name in param:
 		if name.replace('_','') in gest:
@@ -272,34 +471,59 @@ def bench_giop(args, sensor, x_test, y_test, slices, silent=False):
 			est_val = gest[name.replace('_','')]
 			assert(ins_val.shape == est_val.shape), [ins_val.shape, est_val.shape]
 
-			for i in range(ins_val.shape[1]):
-				lbl = 'GIOP %s%s' % (name, waves[i] if 'chl' not in name else '')
-				if not silent:
-					print( performance(lbl, ins_val[:, i], est_val[:, i]) )
-				ests.append(est_val[:,i])
-				lbls.append(lbl)
+			ests[f'GIOP {name}'] = est_val
+
+			if not silent:
+				lbls = _bandwise_labels(f'GIOP {name}', waves, est_val.shape[1])
+				print( '\n'.join(performance_batch(lbls, ins_val, est_val)) )
 		else:
 			assert(0), f'{name} not found in GIOP outputs'
-	return dict(zip(lbls, ests))
+	return ests
+
+
+def _bandwise_labels(key, waves, n_bands):
+	''' Label each of the first n_bands columns of an estimate with the band 
+		wavelength (e.g. 'QAA a' -> 'QAA a443', 'QAA a490', ...). Chl estimates 
+		are not band dependent, and so keep their label. '''
+	return [key if 'chl' in key else '%s%i' % (key, w) for w in waves[:n_bands]]
+
+
+def expand_bandwise(estimates, waves):
+	''' Split each [N, n_bands] estimate into per-band [N] entries, labelled 
+		using _bandwise_labels. '''
+	expanded = {}
+	for key, est_val in estimates.items():
+		expanded.update( zip(_bandwise_labels(key, waves, est_val.shape[1]), est_val.T) )
+	return expanded
 
 
-def bench_iop(*args, **kwargs):
+def bench_iop(args, sensor, *other, **kwargs):
+	''' Returns the per-band IOP estimates, keyed as in expand_bandwise '''
 	iop_ests = {}
-	iop_ests.update( bench_qaa(*args, **kwargs) )
-	# iop_ests.update( bench_giop(*args, **kwargs) )
-	return iop_ests
+	iop_ests.update( bench_qaa(args, sensor, *other, **kwargs) )
+	# iop_ests.update( bench_giop(args, sensor, *other, **kwargs) )
+	return expand_bandwise(iop_ests, get_waves(sensor, args))
 
 
 def bench_tss(args, sensor, x_test, y_test, slices, silent=False):
-	waves = np.array(get_sensor_bands(sensor))[:x_test.shape[1]]
+	x_test= x_test.astype(np.float32, copy=False)
 	A665  = 355.85
 	B665  = 1.74
 	C665  = 1728 
-	R665  = x_test[:, find_wavelength(665, waves)]
-	tss_val = (B665 + (A665 * np.pi * R665) / (1 - np.pi * R665 / C665)).flatten()[:,None] 
+	R665  = np.ascontiguousarray(x_test[:, _cached_index(665, sensor, n_bands=x_test.shape[1])])
+
+	# Evaluate in a single fused pass if numexpr is available, rather than one pass per temporary
+	try:
+		import numexpr as ne
+		const   = {k: R665.dtype.type(v) for k, v in [('A665', A665), ('B665', B665), ('C665', C665), ('PI', np.pi)]}
+		tss_val = ne.evaluate('B665 + (A665 * PI * R665) / (1 - PI * R665 / C665)', local_dict=dict(const, R665=R665))
+	except ImportError:
+		tss_val = B665 + (A665 * np.pi * R665) / (1 - np.pi * R665 / C665)
+
+	# Keep the output dtype independent of which path was taken
+	tss_val = tss_val.astype(R665.dtype, copy=False).flatten()[:,None] 
 	ins_val = y_test[:, slices['tss']]
-	for i in range(ins_val.shape[1]):
-		if not silent: print( performance('Nechad', ins_val[:, i], tss_val) )
+	if not silent: print( '\n'.join(performance_batch('Nechad', ins_val, tss_val)) )
 	return {'Nechad TSS': tss_val}
 
 
@@ -310,10 +534,10 @@ def bench_chl(*args, **kwargs):
 def run_benchmarks(args, sensor, x_test, y_test, slices, silent=True, x_train=None, y_train=None, gridsearch=False, with_ml=False):
 	benchmarks = {}
 	if len([k for k in slices if k[0] in ['a','b'] and '*' not in k and 'ad' not in k]):
-		benchmarks.update( bench_qaa(args, sensor, x_test, y_test, slices, silent) )
+		benchmarks.update( expand_bandwise(bench_qaa(args, sensor, x_test, y_test, slices, silent), get_waves(sensor, args)) )
 
 		# if 'aph' in slices or 'apg' in slices:
-		# 	benchmarks.update( bench_giop(args, sensor, x_test, y_test, slices, silent) )
+		# 	benchmarks.update( expand_bandwise(bench_giop(args, sensor, x_test, y_test, slices, silent), get_waves(sensor, args)) )
 
 	if 'chl' in slices:
 		benchmarks.update( bench_chl(args, sensor, x_test, y_test, slices, silent) )
@@ -42,6 +42,25 @@ def label(name):
 	return helper
 
 
+def batch_of(metric):
+	''' Register a vectorized version of the given metric, which is used by
+		performance_batch. The vectorized function receives 2-D y1 / y2 
+		arrays along with the valid (finite) and positive masks, and must
+		return one value per column - matching the metric itself applied 
+		to each column individually. It must be kept in sync whenever the 
+		metric is modified. '''
+	def helper(f):
+		metric.batch = f 
+		return f
+	return helper
+
+
+def _masked(mask, values):
+	''' Set elements outside of the mask to nan, so that nan-aware 
+		reductions only operate over the masked subset of each column '''
+	return np.where(mask, values, np.nan)
+
+
 @label('RMSE')
 @flatten
 @only_valid
@@ -51,6 +70,11 @@ def rmse(y1, y2):
 	return np.mean((y1 - y2) ** 2) ** .5
 
 
+@batch_of(rmse)
+def _rmse_batch(y1, y2, valid, pos):
+	return np.nanmean(_masked(valid, y1 - y2) ** 2, 0) ** .5
+
+
 @label('RMSLE')
 @flatten
 @only_valid
@@ -60,6 +84,11 @@ def rmsle(y1, y2):
 	return np.mean(np.abs(np.log(y1) - np.log(y2)) ** 2) ** 0.5 
 
 
+@batch_of(rmsle)
+def _rmsle_batch(y1, y2, valid, pos):
+	return np.nanmean(_masked(pos, np.log(y1) - np.log(y2)) ** 2, 0) ** 0.5
+
+
 @label('NRMSE')
 @flatten
 @only_valid
@@ -76,6 +105,11 @@ def mae(y1, y2):
 	return np.mean(np.abs(y1 - y2))
 
 
+@batch_of(mae)
+def _mae_batch(y1, y2, valid, pos):
+	return np.nanmean(_masked(valid, np.abs(y1 - y2)), 0)
+
+
 # @label('MAE')
 # @flatten
 # @only_valid
@@ -98,6 +132,16 @@ def mape(y1, y2):
 	return 100 * np.median(np.abs((y1 - y2) / y1))
 
 
+@batch_of(mape)
+def _mape_batch(y1, y2, valid, pos):
+	ape = _masked(valid, np.abs((y1 - y2) / y1))
+	val = 100 * np.nanmedian(ape, 0)
+
+	# np.median propagates nan, which occurs for valid samples with y1 == y2 == 0
+	val[np.any(valid & np.isnan(ape), 0)] = np.nan
+	return val
+
+
 @label('<=0')
 @flatten
 @only_valid
@@ -119,6 +163,11 @@ def leqznan(y1, y2=None):
 		return np.logical_or(np.isnan(y2), y2 <= 0).sum()
 
 
+@batch_of(leqznan)
+def _leqznan_batch(y1, y2, valid, pos):
+	return np.logical_or(np.isnan(y2), y2 <= 0).sum(0)
+
+
 @label('MdSA')
 @flatten
 @only_valid
@@ -131,6 +180,12 @@ def mdsa(y1, y2):
 	return 100 * (np.exp(np.median(np.abs(Q[i]))) - 1)
 
 
+@batch_of(mdsa)
+def _mdsa_batch(y1, y2, valid, pos):
+	Q = _masked(pos, np.log(y2 / y1))
+	return 100 * (np.exp(np.nanmedian(np.abs(Q), 0)) - 1)
+
+
 @label('MSA')
 @flatten
 @only_valid
@@ -157,6 +212,12 @@ def sspb(y1, y2):
 	return 100 * np.sign(M) * (np.exp(np.abs(M)) - 1)
 
 
+@batch_of(sspb)
+def _sspb_batch(y1, y2, valid, pos):
+	M = np.nanmedian(_masked(pos, np.log(y2 / y1)), 0)
+	return 100 * np.sign(M) * (np.exp(np.abs(M)) - 1)
+
+
 @label('Bias')
 @flatten
 @only_valid
@@ -165,6 +226,11 @@ def bias(y1, y2):
 	return np.mean(y2 - y1)
 
 
+@batch_of(bias)
+def _bias_batch(y1, y2, valid, pos):
+	return np.nanmean(_masked(valid, y2 - y1), 0)
+
+
 # @label('Bias')
 # @flatten
 # @only_valid
@@ -206,6 +272,18 @@ def slope(y1, y2):
 	return slope_
 
 
+@batch_of(slope)
+def _slope_batch(y1, y2, valid, pos):
+	# Least squares slope in log space, equivalent to stats.linregress per column
+	x = _masked(pos, np.log10(y1))
+	y = _masked(pos, np.log10(y2))
+	x = x - np.nanmean(x, 0)
+	y = y - np.nanmean(y, 0)
+	val = np.nansum(x * y, 0) / np.nansum(x ** 2, 0)
+	val[pos.sum(0) < 3] = np.nan
+	return val
+
+
 @label('Intercept')
 @flatten
 @only_valid
@@ -236,8 +314,34 @@ def mwr(y1, y2, y3):
 	return stats.sum() / np.isfinite(y1).sum()
 
 
-def performance(key, y1, y2, metrics=[rmse, slope, mdsa, rmsle, sspb, mape, mae, bias, leqznan]):#[rmse, rmsle, mape, r_squared, bias, mae, leqznan, slope]):
+# Default metrics shown by performance and performance_batch
+PERFORMANCE_METRICS = [rmse, slope, mdsa, rmsle, sspb, mape, mae, bias, leqznan]#[rmse, rmsle, mape, r_squared, bias, mae, leqznan, slope]
+
+
+def performance(key, y1, y2, metrics=PERFORMANCE_METRICS):
 	''' Return a string containing performance using various metrics. 
 		y1 should be the true value, y2 the estimated value. '''
 	return '%8s | %s' % (key, '   '.join([
-			'%s: %6.3f' % (f.__name__, f(y1,y2)) for f in metrics]))
\ No newline at end of file
+			'%s: %6.3f' % (f.__name__, f(y1,y2)) for f in metrics]))
+
+
+def performance_batch(key, y1, y2, metrics=PERFORMANCE_METRICS):
+	''' Vectorized version of performance, which evaluates every column of
+		y1 (true) against y2 (estimated) at once. y2 is broadcast against y1, 
+		and key may be a single label or one label per column. Metrics with 
+		a vectorized version (see batch_of) are reduced over all columns 
+		together; any others are evaluated column by column. Returns a list 
+		containing one string per column, identical to those of performance. '''
+	y1   = np.asarray(y1, dtype=float).reshape(len(y1), -1)
+	y2   = np.broadcast_to(np.asarray(y2, dtype=float).reshape(len(y2), -1), y1.shape)
+	keys = [key] * y1.shape[1] if isinstance(key, str) else key
+
+	with warnings.catch_warnings(), np.errstate(all='ignore'):
+		warnings.filterwarnings('ignore')
+		valid  = np.isfinite(y1) & np.isfinite(y2)
+		pos    = valid & (y1 > 0) & (y2 > 0)
+		values = [f.batch(y1, y2, valid, pos) if hasattr(f, 'batch') else 
+				  [f(y1[:, i], y2[:, i]) for i in range(y1.shape[1])] for f in metrics]
+
+	return ['%8s | %s' % (k, '   '.join([
+			'%s: %6.3f' % (f.__name__, v[i]) for f, v in zip(metrics, values)])) for i, k in enumerate(keys)]